@@ -1,70 +1,70 @@
 import sys
-from math import inf
 
 import logic
 import network
+from logic import COST_INF
+
+# input() flushes stdout/stderr and goes through the prompt machinery on
+# every call; reading stdin directly avoids that per-command overhead
+_readline = sys.stdin.readline
 
 
 # --- main input loop ---
 def command_loop():
     while True:
-        try:
-            line = input().strip()
-        except EOFError:
+        raw = _readline()
+        if not raw:
             return  # user closed input (rare)
 
+        line = raw.strip()
         if not line:
             continue
 
         parts = line.split()
         cmd = parts[0].lower()
 
-        # ----------------------- update -----------------------
-        if cmd == "update":
-            if len(parts) != 4:
-                print("update invalid_arguments")
-                continue
+        handler = _HANDLERS.get(cmd)
+        if handler is not None:
+            handler(parts)
+        else:
+            print(f"{cmd} unknown_command")
 
-            a = int(parts[1])
-            b = int(parts[2])
-            cost = parts[3]   # may be "inf"
 
-            update(a, b, cost)
-            continue
+# --- per-command handlers (each owns its arity check) ---
+def _handle_update(parts):
+    if len(parts) != 4:
+        print("update invalid_arguments")
+        return
 
-        # ----------------------- step -------------------------
-        elif cmd == "step":
-            step()
-            continue
+    a = int(parts[1])
+    b = int(parts[2])
+    cost = parts[3]   # may be "inf"
 
-        # ----------------------- packets ----------------------
-        elif cmd == "packets":
-            packets()
-            continue
+    update(a, b, cost)
 
-        # ----------------------- display ----------------------
-        elif cmd == "display":
-            display()
-            continue
 
-        # ----------------------- disable ----------------------
-        elif cmd == "disable":
-            if len(parts) != 2:
-                print("disable invalid_arguments")
-                continue
+def _handle_step(parts):
+    step()
 
-            nid = int(parts[1])
-            disable(nid)
-            continue
 
-        # ----------------------- crash ------------------------
-        elif cmd == "crash":
-            crash()
-            continue
+def _handle_packets(parts):
+    packets()
 
-        # ----------------------- unknown ----------------------
-        else:
-            print(f"{cmd} unknown_command")
+
+def _handle_display(parts):
+    display()
+
+
+def _handle_disable(parts):
+    if len(parts) != 2:
+        print("disable invalid_arguments")
+        return
+
+    disable(int(parts[1]))
+
+
+def _handle_crash(parts):
+    crash()
 
 
 def update(a, b, cost):
@@ -117,11 +117,8 @@ def packets():
     - Print 'packets SUCCESS'.
     """
     try:
-        # Print count first
-        print(network.pkt_count)
-
-        # Reset counter in the network module
-        network.pkt_count = 0
+        # Fetch-and-zero is atomic against the receive thread
+        print(network.read_and_reset_pkt_count())
 
         # Required by spec
         print("packets SUCCESS")
@@ -144,17 +141,18 @@ def display():
     - Print 'display SUCCESS' afterward
     """
     try:
-        # Sort by destination ID
-        for dest in sorted(logic.routing.keys()):
-            next_hop, cost = logic.routing[dest]
-
-            # Format next hop
-            nh_print = next_hop if next_hop is not None else -1
+        # Hold the state lock so the table can't change mid-print
+        with logic._state_lock:
+            # logic keeps this sorted by destination ID
+            for dest in logic.routing_sorted_keys:
+                next_hop, cost = logic.routing[dest]
 
-            # Format cost (infinity => 65535)
-            cost_print = int(cost) if cost < inf else 65535
+                # Format next hop
+                nh_print = next_hop if next_hop is not None else -1
 
-            print(f"{dest} {nh_print} {cost_print}")
+                # Costs are ints with COST_INF (65535) as the sentinel, so
+                # they already print in the required form
+                print(f"{dest} {nh_print} {cost}")
 
         print("display SUCCESS")
 
@@ -175,7 +173,7 @@ def disable(nid):
         nid = int(nid)
 
         # Check if it's a current direct neighbor with finite cost
-        if nid not in logic.neighbors or logic.neighbors[nid] == inf:
+        if nid not in logic.neighbors or logic.neighbors[nid] == COST_INF:
             print("disable not_a_neighbor")
             return
 
@@ -192,14 +190,13 @@ def crash():
     """
     Handle the 'crash' command
 
-    - Set all neighbors' link costs to infinity via logic.update_link.
+    - Set all neighbors' link costs to infinity.
     - Print 'crash SUCCESS'.
     - Terminate the process.
     """
     try:
-        # Mark all links down using logic helper
-        for nid in list(logic.neighbors.keys()):
-            logic.update_link(logic.my_id, nid, "inf")
+        # Mark all links down in one pass (single recompute)
+        logic.crash_all_links()
 
         print("crash SUCCESS")
 
@@ -208,3 +205,14 @@ def crash():
 
     except Exception as e:
         print(f"crash {e}")
+
+
+# Command dispatch: one dict lookup instead of a string-compare chain
+_HANDLERS = {
+    "update": _handle_update,
+    "step": _handle_step,
+    "packets": _handle_packets,
+    "display": _handle_display,
+    "disable": _handle_disable,
+    "crash": _handle_crash,
+}
@@ -1,6 +1,6 @@
 import argparse
 import sys
-from logic import init as logic_init
+from logic import COST_INF, init as logic_init
 from cli import command_loop
 from network import init_network, start_periodic_updates
 
@@ -42,26 +42,12 @@ def parse_topology_file(path):
         self_id = int(parts[0])
         nb = int(parts[1])
         cost = parts[2]
-        neighbors.setdefault(self_id, {})[nb] = float("inf") if cost == "inf" else float(cost)
+        neighbors.setdefault(self_id, {})[nb] = COST_INF if cost == "inf" else int(cost)
         idx += 1
 
     return servers, neighbors
 
 
-def determine_my_id(servers, my_port):
-    """
-    Determine which server ID we are based on the port we bind to.
-    This is the REQUIRED behavior in the project spec.
-    """
-
-    for sid, (ip, port) in servers.items():
-        if port == my_port:
-            return sid
-
-    print("ERROR: Could not determine my server-id from topology file (port mismatch).")
-    sys.exit(1)
-
-
 def main():
     parser = argparse.ArgumentParser(description="Distance Vector Routing Server")
 
@@ -73,32 +59,11 @@ def main():
     topo_path = args.t
     interval = args.i
 
-    # ---- Parse topology file ----
+    # ---- Parse topology file (once; everything below reuses these dicts) ----
     servers, all_neighbors = parse_topology_file(topo_path)
 
-    # Find my port by looking at all entries in the topo
-    # The trick: The topology file stores neighbors in blocks keyed by EACH server
-    # We find which block corresponds to THIS server by matching ports after binding.
-    # But we need to know my_port BEFORE init_network.
-    #
-    # Simple solution:
-    # Every topoN.txt corresponds to server N.
-    # So look for ONLY the neighbors with key "N".
-    #
-    # But the spec wants auto-detection:
-    # Auto-detection must be done based on PORT after we bind.
-    #
-    # So: we must choose a dummy port first, but network.py will bind for us.
-    #
-    # Best solution:
-    # Read MY port by looking for ANY server whose neighbors block exists.
-    # Actually, project files always have the neighbors listed for the server whose topo it is.
-    # Example: topo3.txt has lines:
-    #     3 1 4
-    #     3 4 3
-    #
-    # So: the "self-id" for neighbors tells us our identity before networking starts.
-    #     my_id = the server id present in neighbors dict.
+    # The topo file lists neighbor lines only for the server it belongs
+    # to, so the self-id keying the neighbors dict is our identity.
 
     if len(all_neighbors) == 0:
         print("ERROR: Topology file missing neighbor entries.")
@@ -116,8 +81,9 @@ def main():
     # neighbors dict for logic.init() should be just the neighbor costs for THIS server
     my_neighbors = all_neighbors[my_id_from_file]
 
-    # Initialize DV logic with our ID + neighbors
-    logic_init(my_id_from_file, my_neighbors)
+    # Initialize DV logic with our ID + neighbors; the full server list
+    # lets it preallocate its advertised-cost matrix
+    logic_init(my_id_from_file, my_neighbors, list(servers.keys()))
 
     # Start periodic DV updates
     start_periodic_updates(interval)